@@ -1,25 +1,120 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastmcp import FastMCP
 import httpx
+import orjson
 import os
-import json
+
+# Configuration is read once at import; fail fast if it is missing
+_API_KEY = os.getenv("DAYTONA_API_KEY")
+if not _API_KEY:
+    raise ValueError("DAYTONA_API_KEY environment variable is not set")
+
+_BASE_URL = os.getenv("DAYTONA_SERVER_URL")
+if not _BASE_URL:
+    raise ValueError("DAYTONA_SERVER_URL environment variable is not set")
+_BASE_URL = _BASE_URL.rstrip('/')
+
+# No default Content-Type: httpx sets it per request (JSON body vs multipart upload).
+# Accept-Encoding is left to httpx, which advertises gzip/deflate plus br/zstd when those extras are installed.
+_HEADERS = {
+    "Authorization": f"Bearer {_API_KEY}"
+}
+
+# Request headers for JSON bodies serialized with orjson
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# API paths are relative to the shared client's base_url
+_SANDBOX_PATH = "/api/sandbox"
+
+# Connection pool sizing for concurrent tool calls against the Daytona host
+try:
+    _MAX_CONNECTIONS = int(os.getenv("DAYTONA_MAX_CONNECTIONS", "1000"))
+except ValueError:
+    raise ValueError("DAYTONA_MAX_CONNECTIONS environment variable must be an integer") from None
+
+try:
+    _MAX_KEEPALIVE = int(os.getenv("DAYTONA_MAX_KEEPALIVE", "100"))
+except ValueError:
+    raise ValueError("DAYTONA_MAX_KEEPALIVE environment variable must be an integer") from None
+
+# Shared HTTP client, created lazily on first use so it binds to the running event loop
+_client: httpx.AsyncClient | None = None
+
+@asynccontextmanager
+async def lifespan(server):
+    try:
+        yield
+    finally:
+        await reset_client()
 
 # Initialize FastMCP
-mcp = FastMCP("daytona")
-
-def get_headers() -> dict:
-    api_key = os.getenv("DAYTONA_API_KEY")
-    if not api_key:
-        raise ValueError("DAYTONA_API_KEY environment variable is not set")
-    return {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-def get_base_url() -> str:
-    url = os.getenv("DAYTONA_SERVER_URL")
-    if not url:
-        raise ValueError("DAYTONA_SERVER_URL environment variable is not set")
-    return url.rstrip('/')
+mcp = FastMCP("daytona", lifespan=lifespan)
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the shared AsyncClient, creating it on first use.
+    Reusing one client keeps connections alive across tool calls.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=_BASE_URL,
+            headers=_HEADERS,
+            limits=httpx.Limits(
+                max_connections=_MAX_CONNECTIONS,
+                max_keepalive_connections=_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+            timeout=30.0,
+            http2=True,
+        )
+    return _client
+
+async def reset_client() -> None:
+    """
+    Close and drop the shared AsyncClient; the next get_client() call builds a fresh pool.
+    """
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+
+async def download_file(sandbox_id: str, path: str) -> str:
+    """
+    Download a file from the sandbox, reading the response body in chunks.
+    """
+    client = get_client()
+    async with client.stream("GET", f"/api/toolbox/{sandbox_id}/files/download", params={"path": path}) as response:
+        if not response.is_success:
+            # Load the body so callers can report it via e.response.text (raise_for_status also raises on 3xx)
+            await response.aread()
+        response.raise_for_status()
+        buf = bytearray()
+        async for chunk in response.aiter_bytes(65536):
+            buf.extend(chunk)
+    return buf.decode("utf-8", errors="replace")
+
+async def run_command(sandbox_id: str, command: str) -> dict:
+    """
+    Execute a command in the sandbox and return the parsed result (exitCode, stdout, stderr).
+    """
+    # endpoint structure based on research: /api/toolbox/{id}/process/execute
+    # Note: Some docs suggest /api/toolbox/{id}/toolbox/process/execute, we will try the shorter one first or handle 404
+    payload = {"command": command}
+    
+    client = get_client()
+    response = await client.post(f"/api/toolbox/{sandbox_id}/process/execute", content=orjson.dumps(payload), headers=_JSON_HEADERS, timeout=60.0)
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+def describe_error(e: httpx.HTTPError, action: str) -> str:
+    """
+    Render an httpx error as a tool result message.
+    """
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"HTTP Error {action}: {e.response.status_code} - {e.response.text}"
+    return f"Error {action}: {str(e)}"
 
 @mcp.tool()
 async def list_sandboxes() -> str:
@@ -27,17 +122,12 @@ async def list_sandboxes() -> str:
     List all active Daytona sandboxes.
     """
     try:
-        url = f"{get_base_url()}/api/sandbox"
-        headers = get_headers()
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            return json.dumps(response.json(), indent=2)
-    except httpx.HTTPStatusError as e:
-        return f"HTTP Error listing sandboxes: {e.response.status_code} - {e.response.text}"
-    except Exception as e:
-        return f"Error listing sandboxes: {str(e)}"
+        client = get_client()
+        response = await client.get(_SANDBOX_PATH)
+        response.raise_for_status()
+        return orjson.dumps(orjson.loads(response.content), option=orjson.OPT_INDENT_2).decode()
+    except httpx.HTTPError as e:
+        return describe_error(e, "listing sandboxes")
 
 @mcp.tool()
 async def create_sandbox(repository_url: str) -> str:
@@ -47,9 +137,6 @@ async def create_sandbox(repository_url: str) -> str:
         repository_url: The URL of the Git repository to create the sandbox from.
     """
     try:
-        url = f"{get_base_url()}/api/sandbox"
-        headers = get_headers()
-        
         # Constructing the payload based on common Daytona API patterns
         # Adjust command/image/user if necessary based on specific API version docs
         payload = {
@@ -58,17 +145,15 @@ async def create_sandbox(repository_url: str) -> str:
                     "url": repository_url
                 }
             },
-            "name": repository_url.split("/")[-1].replace(".git", "") 
+            "name": repository_url.rpartition("/")[2].removesuffix(".git")
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            return f"Sandbox created successfully. Details: {json.dumps(response.json(), indent=2)}"
-    except httpx.HTTPStatusError as e:
-        return f"HTTP Error creating sandbox: {e.response.status_code} - {e.response.text}"
-    except Exception as e:
-        return f"Error creating sandbox: {str(e)}"
+        client = get_client()
+        response = await client.post(_SANDBOX_PATH, content=orjson.dumps(payload), headers=_JSON_HEADERS)
+        response.raise_for_status()
+        return f"Sandbox created successfully. Details: {orjson.dumps(orjson.loads(response.content), option=orjson.OPT_INDENT_2).decode()}"
+    except httpx.HTTPError as e:
+        return describe_error(e, "creating sandbox")
 
 @mcp.tool()
 async def get_sandbox_info(sandbox_id: str) -> str:
@@ -78,17 +163,12 @@ async def get_sandbox_info(sandbox_id: str) -> str:
         sandbox_id: The ID of the sandbox to retrieve info for.
     """
     try:
-        url = f"{get_base_url()}/api/sandbox/{sandbox_id}"
-        headers = get_headers()
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            return json.dumps(response.json(), indent=2)
-    except httpx.HTTPStatusError as e:
-        return f"HTTP Error getting sandbox info: {e.response.status_code} - {e.response.text}"
-    except Exception as e:
-        return f"Error getting sandbox info: {str(e)}"
+        client = get_client()
+        response = await client.get(f"/api/sandbox/{sandbox_id}")
+        response.raise_for_status()
+        return orjson.dumps(orjson.loads(response.content), option=orjson.OPT_INDENT_2).decode()
+    except httpx.HTTPError as e:
+        return describe_error(e, "getting sandbox info")
 
 @mcp.tool()
 async def remove_sandbox(sandbox_id: str) -> str:
@@ -98,17 +178,12 @@ async def remove_sandbox(sandbox_id: str) -> str:
         sandbox_id: The ID of the sandbox to remove.
     """
     try:
-        url = f"{get_base_url()}/api/sandbox/{sandbox_id}"
-        headers = get_headers()
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(url, headers=headers)
-            response.raise_for_status()
-            return f"Sandbox {sandbox_id} removed successfully"
-    except httpx.HTTPStatusError as e:
-        return f"HTTP Error removing sandbox: {e.response.status_code} - {e.response.text}"
-    except Exception as e:
-        return f"Error removing sandbox: {str(e)}"
+        client = get_client()
+        response = await client.delete(f"/api/sandbox/{sandbox_id}")
+        response.raise_for_status()
+        return f"Sandbox {sandbox_id} removed successfully"
+    except httpx.HTTPError as e:
+        return describe_error(e, "removing sandbox")
 
 @mcp.tool()
 async def execute_command(sandbox_id: str, command: str) -> str:
@@ -119,25 +194,39 @@ async def execute_command(sandbox_id: str, command: str) -> str:
         command: The command to execute.
     """
     try:
-        # endpoint structure based on research: /api/toolbox/{id}/process/execute
-        # Note: Some docs suggest /api/toolbox/{id}/toolbox/process/execute, we will try the shorter one first or handle 404
-        url = f"{get_base_url()}/api/toolbox/{sandbox_id}/process/execute"
-        headers = get_headers()
-        payload = {"command": command}
-        
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            # Result usually contains exitCode, stdout, stderr
-            output = f"Exit Code: {result.get('exitCode', 'Unknown')}\n"
-            output += f"Stdout: {result.get('stdout', '')}\n"
-            output += f"Stderr: {result.get('stderr', '')}"
-            return output
-    except httpx.HTTPStatusError as e:
-        return f"HTTP Error executing command: {e.response.status_code} - {e.response.text}"
-    except Exception as e:
-        return f"Error executing command: {str(e)}"
+        result = await run_command(sandbox_id, command)
+        # Result usually contains exitCode, stdout, stderr
+        output = f"Exit Code: {result.get('exitCode', 'Unknown')}\n"
+        output += f"Stdout: {result.get('stdout', '')}\n"
+        output += f"Stderr: {result.get('stderr', '')}"
+        return output
+    except httpx.HTTPError as e:
+        return describe_error(e, "executing command")
+
+@mcp.tool()
+async def execute_commands(sandbox_id: str, commands: list[str]) -> str:
+    """
+    Execute several independent shell commands concurrently within a Daytona sandbox.
+    Commands run in parallel, so they must not depend on each other's side effects.
+    Args:
+        sandbox_id: The ID of the sandbox to execute the commands in.
+        commands: The commands to execute.
+    """
+    results = await asyncio.gather(*(run_command(sandbox_id, c) for c in commands), return_exceptions=True)
+    output = []
+    for command, result in zip(commands, results):
+        if isinstance(result, httpx.HTTPError):
+            output.append({"command": command, "error": describe_error(result, "executing command")})
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            output.append({
+                "command": command,
+                "exitCode": result.get("exitCode", "Unknown"),
+                "stdout": result.get("stdout", ""),
+                "stderr": result.get("stderr", ""),
+            })
+    return orjson.dumps(output, option=orjson.OPT_INDENT_2).decode()
 
 @mcp.tool()
 async def read_file(sandbox_id: str, path: str) -> str:
@@ -149,18 +238,28 @@ async def read_file(sandbox_id: str, path: str) -> str:
     """
     try:
         # /api/toolbox/{id}/files/download?path=...
-        url = f"{get_base_url()}/api/toolbox/{sandbox_id}/files/download"
-        headers = get_headers()
-        params = {"path": path}
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            return response.text
-    except httpx.HTTPStatusError as e:
-        return f"HTTP Error reading file: {e.response.status_code} - {e.response.text}"
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
+        return await download_file(sandbox_id, path)
+    except httpx.HTTPError as e:
+        return describe_error(e, "reading file")
+
+@mcp.tool()
+async def read_files(sandbox_id: str, paths: list[str]) -> str:
+    """
+    Read the contents of several files from a Daytona sandbox concurrently.
+    Args:
+        sandbox_id: The ID of the sandbox.
+        paths: The absolute paths to the files within the sandbox.
+    """
+    results = await asyncio.gather(*(download_file(sandbox_id, p) for p in paths), return_exceptions=True)
+    output = []
+    for path, result in zip(paths, results):
+        if isinstance(result, httpx.HTTPError):
+            output.append({"path": path, "error": describe_error(result, "reading file")})
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            output.append({"path": path, "content": result})
+    return orjson.dumps(output, option=orjson.OPT_INDENT_2).decode()
 
 @mcp.tool()
 async def write_file(sandbox_id: str, path: str, content: str) -> str:
@@ -174,23 +273,17 @@ async def write_file(sandbox_id: str, path: str, content: str) -> str:
     try:
         # /api/toolbox/{id}/files/upload?path=... is common, or form data
         # Based on typical implementations, we upload as a file
-        url = f"{get_base_url()}/api/toolbox/{sandbox_id}/files/upload"
-        headers = get_headers()
-        # Remove Content-Type json for upload if sending files/form
-        upload_headers = headers.copy()
-        upload_headers.pop("Content-Type", None)
-        
         params = {"path": path}
-        files = {"file": (path.split('/')[-1], content)}
+        # Encode once up front: httpx streams multipart parts as-is, but would encode a str
+        # twice (once for Content-Length, once when sending)
+        files = {"file": (path.split('/')[-1], content.encode("utf-8"))}
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=upload_headers, params=params, files=files)
-            response.raise_for_status()
-            return f"File written successfully to {path}"
-    except httpx.HTTPStatusError as e:
-        return f"HTTP Error writing file: {e.response.status_code} - {e.response.text}"
-    except Exception as e:
-        return f"Error writing file: {str(e)}"
+        client = get_client()
+        response = await client.post(f"/api/toolbox/{sandbox_id}/files/upload", params=params, files=files)
+        response.raise_for_status()
+        return f"File written successfully to {path}"
+    except httpx.HTTPError as e:
+        return describe_error(e, "writing file")
 
 @mcp.tool()
 async def list_files(sandbox_id: str, path: str = ".") -> str:
@@ -201,13 +294,13 @@ async def list_files(sandbox_id: str, path: str = ".") -> str:
         path: The directory path to list (default is current directory ".").
     """
     try:
-        # Initial approach: Execute 'ls -R' (recursive) or just 'ls -la' to give agent visibility
-        # Native API for listing files: fs modules usually exist but simple ls via execute_command is robust for agents
-        # Let's try to map it to a structured output if possible, or just raw text from ls
-        cmd = f"ls -la {path}"
-        return await execute_command(sandbox_id, cmd)
-    except Exception as e:
-        return f"Error listing files: {str(e)}"
+        # /api/toolbox/{id}/files?path=... lists the directory natively, without spawning a shell
+        client = get_client()
+        response = await client.get(f"/api/toolbox/{sandbox_id}/files", params={"path": path})
+        response.raise_for_status()
+        return orjson.dumps(orjson.loads(response.content), option=orjson.OPT_INDENT_2).decode()
+    except httpx.HTTPError as e:
+        return describe_error(e, "listing files")
 
 # --- Prompts ---
 
@@ -255,14 +348,12 @@ async def list_sandboxes_resource() -> str:
     A dynamic resource that lists all active sandboxes in JSON format.
     """
     try:
-        url = f"{get_base_url()}/api/sandbox"
-        headers = get_headers()
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            return json.dumps(response.json(), indent=2)
-    except Exception as e:
-        return json.dumps({"error": str(e)})
+        client = get_client()
+        response = await client.get(_SANDBOX_PATH)
+        response.raise_for_status()
+        return orjson.dumps(orjson.loads(response.content), option=orjson.OPT_INDENT_2).decode()
+    except httpx.HTTPError as e:
+        return orjson.dumps({"error": describe_error(e, "listing sandboxes")}).decode()
 
 @mcp.resource("daytona://{sandbox_id}/files/{path}")
 async def read_file_resource(sandbox_id: str, path: str) -> str:
@@ -279,16 +370,15 @@ async def read_file_resource(sandbox_id: str, path: str) -> str:
         decoded_path = path # fastmcp handles basic matching, but deep paths might catch partial
         # Simple fix: assume path is relative to repo root
         
-        url = f"{get_base_url()}/api/toolbox/{sandbox_id}/files/download"
-        headers = get_headers()
-        params = {"path": decoded_path}
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            return response.text
-    except Exception as e:
-        return f"Error reading resource {sandbox_id}/{path}: {str(e)}"
+        return await download_file(sandbox_id, decoded_path)
+    except httpx.HTTPError as e:
+        return describe_error(e, f"reading resource {sandbox_id}/{path}")
 
 if __name__ == "__main__":
-    mcp.run()
+    # Prefer the libuv-based event loop when available (not supported on Windows)
+    try:
+        import uvloop
+    except ImportError:
+        mcp.run()
+    else:
+        uvloop.run(mcp.run_async())